@@ -1,5 +1,7 @@
 import asyncio
 import json
+import random
+from functools import lru_cache
 from typing import Any, Optional, cast
 
 import aiohttp
@@ -8,6 +10,14 @@ from astrbot.api import AstrBotConfig, logger
 from astrbot.api.event import MessageChain, filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson 可用时直接从 bytes 解析；其 JSONDecodeError 是 json.JSONDecodeError 的子类
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 @register(
     "astrbot_plugin_lanyard",
@@ -23,6 +33,9 @@ class LanyardActivityNotifier(Star):
     """
 
     LANYARD_HTTP_URL_TEMPLATE = "https://api.lanyard.rest/v1/users/{user_id}"
+    HTTP_TIMEOUT = aiohttp.ClientTimeout(total=10)
+    MAX_RETRY_DELAY = 60.0
+    GROUP_ORIGINS_FLUSH_DELAY = 5.0
     ActivityBrief = str | tuple[str, str]
 
     def __init__(self, context: Context, config: AstrBotConfig):
@@ -30,9 +43,34 @@ class LanyardActivityNotifier(Star):
         self.config = config
         self._stop_event = asyncio.Event()
         self._task: Optional[asyncio.Task] = None
-        self._pushed_activities: dict[str, str] = {}
+        self._user_id = ""
+        self._presence_url = ""
+        self._http_proxy: Optional[str] = None
+        self._pushed_activities: dict[int, int] = {}
         self._lock = asyncio.Lock()
         self._http_session: Optional[aiohttp.ClientSession] = None
+        self._settled_body_hash: Optional[int] = None
+        # 按活动类型编号分派的格式化函数，未知类型使用 _format_other
+        self._activity_formatters = {
+            0: self._format_playing,
+            1: self._format_streaming,
+            2: self._format_listening,
+            3: self._format_watching,
+            4: self._format_custom,
+            5: self._format_competing,
+        }
+        self._render_activity_brief_cached = lru_cache(maxsize=8)(
+            self._render_activity_brief
+        )
+        self._group_origins: Optional[dict[str, str]] = None
+        self._origins_dirty = False
+        self._origins_load_task: Optional[asyncio.Task] = None
+        self._origins_flush_handle: Optional[asyncio.TimerHandle] = None
+        self._origins_flush_task: Optional[asyncio.Task] = None
+        self._qq_groups: set[str] = set()
+        self._enable_activity_mask = -1
+        self._filter_config: dict = {"exclude_app_ids": set(), "exclude_fields": {}}
+        self.reload_config()
 
     async def initialize(self):
         """初始化插件，启动 HTTP 轮询"""
@@ -44,6 +82,9 @@ class LanyardActivityNotifier(Star):
             return
 
         logger.info("Lanyard 插件初始化中...")
+        self._user_id = user_id
+        self._presence_url = self.LANYARD_HTTP_URL_TEMPLATE.format(user_id=user_id)
+        self.reload_config()
         self._stop_event = asyncio.Event()
         self._http_session = aiohttp.ClientSession()
         self._task = asyncio.create_task(self._http_poll_loop())
@@ -62,10 +103,27 @@ class LanyardActivityNotifier(Star):
             finally:
                 self._task = None
 
+        if self._origins_flush_handle is not None:
+            self._origins_flush_handle.cancel()
+            self._origins_flush_handle = None
+        await self._flush_group_origins()
+        self._origins_flush_task = None
+
         if self._http_session is not None:
             await self._http_session.close()
             self._http_session = None
 
+    def reload_config(self):
+        """重新解析配置，并清空依赖配置的缓存"""
+        self._qq_groups = self._parse_qq_groups(self.config.get("qq_groups", []))
+        self._enable_activity_mask = self._build_activity_mask(
+            self._parse_enable_activities(self.config.get("enable_activities", []))
+        )
+        self._filter_config = self._get_filter_config()
+        self._http_proxy = self._get_http_proxy()
+        self._render_activity_brief_cached.cache_clear()
+        self._settled_body_hash = None
+
     def _get_poll_interval(self) -> float:
         """获取轮询间隔（秒）"""
         value = self.config.get("poll_interval", 15)
@@ -82,50 +140,102 @@ class LanyardActivityNotifier(Star):
 
     async def _http_poll_loop(self):
         """HTTP 主循环：定时拉取并处理数据"""
-        user_id = str(self.config.get("user_id", "")).strip()
-        if not user_id:
+        if not self._user_id:
             logger.warning("Lanyard 插件: 未配置 Discord 用户 ID，无法启动 HTTP 轮询")
             return
 
         poll_interval = self._get_poll_interval()
         logger.info(f"Lanyard HTTP 轮询已启动，间隔 {poll_interval:g}s")
 
+        loop = asyncio.get_running_loop()
+        # 按截止时间调度，拉取和推送的耗时不会累积到轮询间隔上
+        next_poll = loop.time()
+        failures = 0
         while not self._stop_event.is_set():
+            succeeded = False
             try:
-                presence_data = await self._fetch_presence_data(user_id)
-                if presence_data:
-                    await self._check_and_push_update(presence_data)
+                body = await self._fetch_presence_body()
+                if body is None:
+                    pass
+                elif hash(body) == self._settled_body_hash:
+                    # 与上次已全部推送的响应完全一致，不进入处理协程
+                    succeeded = True
+                else:
+                    succeeded = await self._process_presence_body(body)
             except asyncio.CancelledError:
                 raise
             except Exception as e:
                 logger.error(f"HTTP 轮询错误: {e}")
-            try:
-                await asyncio.wait_for(self._stop_event.wait(), timeout=poll_interval)
-            except TimeoutError:
-                pass
 
-    async def _fetch_presence_data(self, user_id: str) -> Optional[dict]:
-        """通过 HTTP 获取用户 Presence 数据"""
-        url = self.LANYARD_HTTP_URL_TEMPLATE.format(user_id=user_id)
-        proxy = self._get_http_proxy()
+            now = loop.time()
+            if succeeded:
+                failures = 0
+                # 已经落后于计划时间时从当前时间重新对齐，避免连续补拉
+                next_poll = max(next_poll + poll_interval, now)
+            else:
+                failures += 1
+                next_poll = now + self._get_retry_delay(poll_interval, failures)
+            if await self._wait_for_stop(next_poll - now):
+                break
+
+    async def _wait_for_stop(self, timeout: float) -> bool:
+        """等待停止信号，最多等待 timeout 秒，返回是否收到停止信号"""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _get_retry_delay(self, poll_interval: float, failures: int) -> float:
+        """计算连续失败后的重试间隔（指数退避 + 随机抖动）
+
+        抖动幅度与退避间隔成比例，避免多个实例在服务恢复前后同时重试。
+        """
+        max_delay = max(self.MAX_RETRY_DELAY, poll_interval)
+        backoff = min(max_delay, poll_interval * 2 ** min(failures - 1, 10))
+        return backoff + random.uniform(0, backoff / 2)
+
+    async def _fetch_presence_body(self) -> Optional[bytes]:
+        """通过 HTTP 获取用户 Presence 原始响应体"""
+        url = self._presence_url
+        proxy = self._http_proxy
         if self._http_session is None:
             self._http_session = aiohttp.ClientSession()
 
         try:
-            timeout = aiohttp.ClientTimeout(total=10)
             async with self._http_session.get(
-                url, timeout=timeout, proxy=proxy
+                url, timeout=self.HTTP_TIMEOUT, proxy=proxy
             ) as response:
                 if response.status != 200:
                     logger.error(f"HTTP 拉取失败，状态码 {response.status}")
                     return None
-                payload = await response.json(content_type=None)
+                return await response.read()
         except aiohttp.ClientError as e:
             logger.error(f"HTTP 拉取失败，网络错误: {e}")
             return None
         except asyncio.TimeoutError:
             logger.error("HTTP 拉取失败，请求超时")
             return None
+
+    async def _process_presence_body(self, body: bytes) -> bool:
+        """解析并处理有变化的响应体，返回响应体是否为有效的 Presence 数据
+
+        活动全部推送成功后记录响应体哈希，轮询循环据此跳过完全相同的响应。
+        """
+        body_hash = hash(body)
+        presence_data = self._parse_presence_body(body)
+        if presence_data is None:
+            return False
+
+        self._settled_body_hash = None
+        if await self._check_and_push_update(presence_data):
+            self._settled_body_hash = body_hash
+        return True
+
+    def _parse_presence_body(self, body: bytes) -> Optional[dict]:
+        """解析响应体，提取用户 Presence 数据"""
+        try:
+            payload = _json_loads(body)
         except json.JSONDecodeError:
             logger.error("HTTP 拉取失败，响应不是合法 JSON")
             return None
@@ -145,10 +255,13 @@ class LanyardActivityNotifier(Star):
 
         return presence_data
 
-    async def _check_and_push_update(self, presence_data: dict):
-        """检查每个活动是否变化，仅推送新增或变更的活动"""
+    async def _check_and_push_update(self, presence_data: dict) -> bool:
+        """检查每个活动是否变化，仅推送新增或变更的活动
+
+        返回当前所有活动是否都已推送（没有等待重试的活动）。
+        """
         username = self._get_username(presence_data)
-        current_activities = self._collect_current_activities(presence_data)
+        current_activities = self._collect_current_activities(presence_data, username)
 
         current_keys = {activity_key for activity_key, _, _ in current_activities}
         stale_keys = [
@@ -160,11 +273,13 @@ class LanyardActivityNotifier(Star):
             self._pushed_activities.pop(activity_key, None)
 
         pushed_count = 0
+        pending_count = 0
         for activity_key, fingerprint, activity_text in current_activities:
             if self._pushed_activities.get(activity_key) == fingerprint:
                 continue
             pushed = await self._push_update(activity_text)
             if not pushed:
+                pending_count += 1
                 continue
             self._pushed_activities[activity_key] = fingerprint
             pushed_count += 1
@@ -172,25 +287,23 @@ class LanyardActivityNotifier(Star):
         if pushed_count:
             logger.info(f"{username} 有 {pushed_count} 个活动发生变化并已推送")
 
+        return pending_count == 0
+
     def _collect_current_activities(
-        self, presence_data: dict
-    ) -> list[tuple[str, str, str]]:
+        self, presence_data: dict, username: str
+    ) -> list[tuple[int, int, str]]:
         """收集当前活动的 key、指纹和待推送文本"""
-        enable_activities = self._parse_enable_activities(
-            self.config.get("enable_activities", [])
-        )
-        username = self._get_username(presence_data)
         activities = presence_data.get("activities", [])
         if not isinstance(activities, list):
             return []
 
-        current_activities: list[tuple[str, str, str]] = []
+        current_activities: list[tuple[int, int, str]] = []
         for activity in activities:
             if not isinstance(activity, dict):
                 continue
 
             activity_type = activity.get("type", 6)
-            if enable_activities and activity_type not in enable_activities:
+            if not self._is_activity_enabled(activity_type):
                 continue
 
             activity_brief = self._format_activity_brief(activity)
@@ -204,32 +317,39 @@ class LanyardActivityNotifier(Star):
 
         return current_activities
 
-    def _generate_activity_key(self, activity: dict) -> str:
-        """生成活动 key，用于标识同一条活动会话"""
+    def _generate_activity_key(self, activity: dict) -> int:
+        """生成活动 key，用于标识同一条活动会话
+
+        只保留各字段组合的哈希值，已推送缓存中不再持有拼接后的字符串。
+        """
         activity_type = str(activity.get("type", 6))
         activity_id = str(activity.get("id", "")).strip()
         app_id = str(activity.get("application_id", "")).strip()
         name = str(activity.get("name", "")).strip()
         created_at = str(activity.get("created_at", "")).strip()
 
-        key_parts = [
-            activity_type,
-            activity_id or "-",
-            app_id or "-",
-            name or "-",
-            created_at or "-",
-        ]
-        return "|".join(key_parts)
+        return hash(
+            (
+                activity_type,
+                activity_id or "-",
+                app_id or "-",
+                name or "-",
+                created_at or "-",
+            )
+        )
 
     def _generate_single_activity_fingerprint(
         self, activity_brief: ActivityBrief
-    ) -> str:
-        """生成单个活动指纹，用于检测该活动是否发生变化"""
-        return json.dumps(activity_brief, sort_keys=True, ensure_ascii=False)
+    ) -> int:
+        """生成单个活动指纹，用于检测该活动是否发生变化
+
+        指纹只在进程内存中比较，直接使用内置 hash，避免序列化出中间字符串。
+        """
+        return hash(activity_brief)
 
     async def _push_update(self, text: str) -> bool:
         """推送单条活动更新到 QQ 群聊"""
-        qq_groups = self._parse_qq_groups(self.config.get("qq_groups", []))
+        qq_groups = self._qq_groups
         if not qq_groups:
             logger.warning("未配置 QQ 群号，跳过推送")
             return False
@@ -237,39 +357,96 @@ class LanyardActivityNotifier(Star):
         if not text:
             return False
 
-        text = "\u200b" + text + "\u200b"
-        pushed = False
+        try:
+            await self._load_group_origins()
+        except Exception as e:
+            logger.error(f"加载群消息来源缓存失败: {e}")
+            return False
 
-        for group_id in qq_groups:
-            try:
-                chain = MessageChain()
-                chain.message(text)
-
-                umo = await self._get_group_unified_msg_origin(group_id)
-                if not umo:
-                    logger.warning(
-                        f"群 {group_id} 未缓存的 unified_msg_origin，跳过推送。请先在该群发送消息。"
-                    )
-                    continue
-
-                context = cast(Any, self.context)
-                await context.send_message(umo, chain)
-                logger.info(f"已推送活动更新到群 {group_id}")
-                pushed = True
-            except Exception as e:
-                logger.error(f"推送到群 {group_id} 失败: {e}")
+        # 发送时不会修改消息链，所有群共用同一个
+        chain = MessageChain()
+        chain.message(f"\u200b{text}\u200b")
 
-        return pushed
+        results = await asyncio.gather(
+            *(self._send_to_group(group_id, chain) for group_id in qq_groups),
+            return_exceptions=True,
+        )
+        return any(result is True for result in results)
 
-    async def _get_group_unified_msg_origin(self, group_id: str) -> Optional[str]:
-        """获取群的 unified_msg_origin，优先从缓存获取"""
-        async with self._lock:
-            group_origins = await self.get_kv_data("group_origins", {})
-            if not isinstance(group_origins, dict):
-                group_origins = {}
+    async def _send_to_group(self, group_id: str, chain: MessageChain) -> bool:
+        """推送消息链到单个群，返回是否推送成功"""
+        try:
+            umo = self._get_group_unified_msg_origin(group_id)
+            if not umo:
+                logger.warning(
+                    f"群 {group_id} 未缓存的 unified_msg_origin，跳过推送。请先在该群发送消息。"
+                )
+                return False
+
+            context = cast(Any, self.context)
+            await context.send_message(umo, chain)
+            logger.info(f"已推送活动更新到群 {group_id}")
+            return True
+        except Exception as e:
+            logger.error(f"推送到群 {group_id} 失败: {e}")
+            return False
 
-            origin = group_origins.get(group_id)
-            return origin
+    def _get_group_unified_msg_origin(self, group_id: str) -> Optional[str]:
+        """获取群的 unified_msg_origin，直接读取内存缓存（需先加载）"""
+        if self._group_origins is None:
+            return None
+        return self._group_origins.get(group_id)
+
+    async def _load_group_origins(self) -> dict[str, str]:
+        """获取群消息来源缓存，首次使用时从 KV 加载
+
+        并发的首次调用共享同一次加载，不在锁上互相排队；加载失败时下次调用会重试。
+        """
+        if self._group_origins is not None:
+            return self._group_origins
+
+        if self._origins_load_task is None:
+            self._origins_load_task = asyncio.create_task(self._read_group_origins())
+        task = self._origins_load_task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done() and self._origins_load_task is task:
+                self._origins_load_task = None
+
+    async def _read_group_origins(self) -> dict[str, str]:
+        """从 KV 读取群消息来源缓存"""
+        stored = await self.get_kv_data("group_origins", {})
+        self._group_origins = stored if isinstance(stored, dict) else {}
+        return self._group_origins
+
+    def _schedule_origins_flush(self):
+        """延迟写入群消息来源缓存，合并短时间内的多次更新"""
+        if self._origins_flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._origins_flush_handle = loop.call_later(
+                self.GROUP_ORIGINS_FLUSH_DELAY, self._on_origins_flush_due
+            )
+
+    def _on_origins_flush_due(self):
+        """延迟到期，启动一次写入；写入期间的新更新会重新调度"""
+        self._origins_flush_handle = None
+        self._origins_flush_task = asyncio.create_task(self._flush_group_origins())
+
+    async def _flush_group_origins(self):
+        """将有变更的群消息来源缓存写入 KV"""
+        if not self._origins_dirty or self._group_origins is None:
+            return
+
+        async with self._lock:
+            snapshot = dict(self._group_origins)
+            try:
+                await self.put_kv_data("group_origins", snapshot)
+            except Exception as e:
+                logger.debug(f"写入群消息来源缓存失败: {e}")
+                return
+            # 写入期间缓存又有变更时保持脏标记，等待下一次写入
+            self._origins_dirty = self._group_origins != snapshot
 
     @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
     async def _on_group_message(self, event: AstrMessageEvent):
@@ -283,14 +460,18 @@ class LanyardActivityNotifier(Star):
 
         try:
             umo = getattr(event, "unified_msg_origin", None)
-            if umo:
-                async with self._lock:
-                    group_origins = await self.get_kv_data("group_origins", {})
-                    if not isinstance(group_origins, dict):
-                        group_origins = {}
-                    group_origins[str(group_id)] = umo
-                    await self.put_kv_data("group_origins", group_origins)
-                    logger.debug(f"已缓存群 {group_id} 的消息来源")
+            if not umo:
+                return
+
+            group_origins = await self._load_group_origins()
+            group_key = str(group_id)
+            if group_origins.get(group_key) == umo:
+                return
+
+            group_origins[group_key] = umo
+            self._origins_dirty = True
+            self._schedule_origins_flush()
+            logger.debug(f"已缓存群 {group_id} 的消息来源")
         except Exception as e:
             logger.debug(f"缓存群消息来源失败: {e}")
 
@@ -298,7 +479,18 @@ class LanyardActivityNotifier(Star):
         """解析 QQ 群号列表配置"""
         if not isinstance(value, list):
             return set()
-        return {str(x).strip() for x in value if str(x).strip()}
+        return self._parse_str_set(value)
+
+    def _parse_str_set(self, values: list) -> set[str]:
+        """将列表配置转换为去除首尾空白后的非空字符串集合"""
+        result = set()
+        for x in values:
+            if x is None:
+                continue
+            s = str(x).strip()
+            if s:
+                result.add(s)
+        return result
 
     def _parse_enable_activities(self, value: object) -> set[int]:
         """解析启用的活动类型配置"""
@@ -306,16 +498,34 @@ class LanyardActivityNotifier(Star):
             return set()
         result = set()
         for item in value:
-            if isinstance(item, int):
+            if isinstance(item, int) and not isinstance(item, bool):
                 result.add(item)
-                continue
-            if isinstance(item, str):
-                try:
-                    result.add(int(item))
-                except ValueError:
-                    pass
+            elif isinstance(item, str):
+                s = item.strip()
+                digits = s[1:] if s[:1] in ("+", "-") else s
+                if digits.isdecimal():
+                    result.add(int(s))
         return result
 
+    def _build_activity_mask(self, enable_activities: set[int]) -> int:
+        """将启用的活动类型转换为位掩码，-1 表示启用所有类型"""
+        if not enable_activities:
+            return -1
+        mask = 0
+        for activity_type in enable_activities:
+            if 0 <= activity_type < 64:
+                mask |= 1 << activity_type
+        return mask
+
+    def _is_activity_enabled(self, activity_type: object) -> bool:
+        """判断活动类型是否在启用范围内"""
+        mask = self._enable_activity_mask
+        if mask == -1:
+            return True
+        if not isinstance(activity_type, int) or activity_type < 0:
+            return False
+        return bool(mask >> activity_type & 1)
+
     def _get_filter_config(self) -> dict:
         """获取过滤配置"""
         filter_config = self.config.get("filter_config", {})
@@ -331,16 +541,17 @@ class LanyardActivityNotifier(Star):
             exclude_fields = {}
 
         return {
-            "exclude_app_ids": {
-                str(x).strip() for x in exclude_app_ids if str(x).strip()
+            "exclude_app_ids": self._parse_str_set(exclude_app_ids),
+            "exclude_fields": {
+                str(field_name): self._parse_str_set(app_ids)
+                for field_name, app_ids in exclude_fields.items()
+                if isinstance(app_ids, list)
             },
-            "exclude_fields": exclude_fields,
         }
 
     def _should_exclude_app(self, app_id: str) -> bool:
         """判断应用是否应该被排除"""
-        filter_config = self._get_filter_config()
-        return app_id in filter_config["exclude_app_ids"]
+        return app_id in self._filter_config["exclude_app_ids"]
 
     def _should_include_field(
         self, activity_type: int, field_name: str, app_id: str
@@ -349,23 +560,14 @@ class LanyardActivityNotifier(Star):
         if self._should_exclude_app(app_id):
             return False
 
-        filter_config = self._get_filter_config()
-        excluded_fields = filter_config["exclude_fields"].get(field_name, [])
-
-        if not isinstance(excluded_fields, list):
-            excluded_fields = []
-
-        return app_id not in {str(x).strip() for x in excluded_fields if str(x).strip()}
+        excluded_app_ids = self._filter_config["exclude_fields"].get(field_name)
+        return not excluded_app_ids or app_id not in excluded_app_ids
 
     def _format_presence(self, presence_data: dict) -> str:
         """格式化活动信息为可读的文本"""
         username = self._get_username(presence_data)
         discord_status = "offline"
         try:
-            enable_activities = self._parse_enable_activities(
-                self.config.get("enable_activities", [])
-            )
-
             activities_info: list[LanyardActivityNotifier.ActivityBrief] = []
 
             activities = presence_data.get("activities", [])
@@ -376,7 +578,7 @@ class LanyardActivityNotifier(Star):
 
                     activity_type = activity.get("type", 6)
 
-                    if enable_activities and activity_type not in enable_activities:
+                    if not self._is_activity_enabled(activity_type):
                         continue
 
                     activity_msg = self._format_activity_brief(activity)
@@ -414,102 +616,180 @@ class LanyardActivityNotifier(Star):
         if not activities:
             return ""
 
-        lines = []
+        # 推送路径上每次只合并一个活动，直接返回避免构建中间列表
+        if len(activities) == 1:
+            return self._format_activity_line(activities[0], username)
 
-        for activity in activities:
-            if isinstance(activity, tuple):
-                modifier, verb_content = activity
-                lines.append(f"{username} {modifier}{verb_content} 了")
-            else:
-                lines.append(f"{username} {activity} 了")
+        return "\n".join(
+            self._format_activity_line(activity, username) for activity in activities
+        )
 
-        return "\n".join(lines)
+    def _format_activity_line(self, activity: ActivityBrief, username: str) -> str:
+        """格式化单行活动信息"""
+        if isinstance(activity, tuple):
+            modifier, verb_content = activity
+            return f"{username} {modifier}{verb_content} 了"
+        return f"{username} {activity} 了"
 
     def _format_activity_brief(self, activity: dict) -> ActivityBrief | None:
-        """格式化单个活动（返回字符串或修饰词和动词+内容的元组）"""
-        activity_name = "Unknown"
-        try:
-            activity_type = activity.get("type", 6)
-            activity_name = activity.get("name", "Unknown")
-            details = activity.get("details", "")
-            state = activity.get("state", "")
-            assets = activity.get("assets", {})
-            app_id = activity.get("application_id", "")
-
-            if app_id and self._should_exclude_app(app_id):
-                return None
-
-            if activity_type == 0:
-                game_info_parts = [f"玩 {activity_name}"]
-
-                if self._should_include_field(activity_type, "large_text", app_id):
-                    if assets and assets.get("large_text"):
-                        large_text = assets["large_text"].strip()
-                        game_info_parts.append(large_text)
-
-                if self._should_include_field(activity_type, "state", app_id):
-                    if state:
-                        state_text = state.strip()
-                        game_info_parts.append(state_text)
-
-                if self._should_include_field(activity_type, "details", app_id):
-                    if details:
-                        game_info_parts.append(details)
-
-                game_info = " | ".join(game_info_parts)
-                return ("开始", game_info)
-
-            elif activity_type == 1:
-                stream_info = f"直播 {activity_name}"
-                if details and self._should_include_field(
-                    activity_type, "details", app_id
-                ):
-                    stream_info += f" ({details})"
-                return ("开始", stream_info)
-
-            elif activity_type == 2:
-                # Spotify
-                if (
-                    details
-                    and state
-                    and self._should_include_field(activity_type, "details", app_id)
-                    and self._should_include_field(activity_type, "state", app_id)
-                ):
-                    return ("开始", f"听 {details} - {state}")
-                elif details and self._should_include_field(
-                    activity_type, "details", app_id
-                ):
-                    return ("开始", f"听 {details}")
-                elif state and self._should_include_field(
-                    activity_type, "state", app_id
-                ):
-                    return ("开始", f"听 {state}")
-                return ("开始", f"听 {activity_name}")
-
-            elif activity_type == 3:
-                watching_info = f"看 {activity_name}"
-                if details and self._should_include_field(
-                    activity_type, "details", app_id
-                ):
-                    watching_info += f" ({details})"
-                return ("开始", watching_info)
-
-            elif activity_type == 4:
-                if state and self._should_include_field(activity_type, "state", app_id):
-                    return state
-                return "自定义状态"
-
-            elif activity_type == 5:
-                competing_info = f"竞争 {activity_name}"
-                if details and self._should_include_field(
-                    activity_type, "details", app_id
-                ):
-                    competing_info += f" ({details})"
-                return ("开始", competing_info)
+        """格式化单个活动（返回字符串或修饰词和动词+内容的元组）
+
+        相同字段的活动会被反复拉取到，渲染结果通过小容量 LRU 缓存复用。
+        """
+        fields = self._activity_brief_fields(activity)
+        return self._render_activity_brief_cached(*fields)
+
+    def _activity_brief_fields(
+        self, activity: dict
+    ) -> tuple[int, str, str, str, str, str]:
+        """提取渲染单个活动所需的字段，同时作为渲染缓存的 key
+
+        类型异常的字段按缺省值处理，保证结果可哈希、渲染时无需再做异常兜底。
+        """
+        activity_type = activity.get("type", 6)
+        if not isinstance(activity_type, int):
+            activity_type = 6
+        assets = activity.get("assets")
+        large_text = assets.get("large_text") if isinstance(assets, dict) else None
+        return (
+            activity_type,
+            self._text_field(activity.get("name"), "Unknown"),
+            self._text_field(activity.get("details"), ""),
+            self._text_field(activity.get("state"), ""),
+            self._text_field(large_text, ""),
+            self._text_field(activity.get("application_id"), ""),
+        )
 
-            else:
-                return ("开始", f"捣鼓 {activity_name}")
+    def _text_field(self, value: object, default: str) -> str:
+        """读取字符串字段，非字符串时返回缺省值"""
+        return value if isinstance(value, str) else default
+
+    def _render_activity_brief(
+        self,
+        activity_type: int,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief | None:
+        """根据活动字段渲染单个活动，按活动类型分派到对应的格式化函数"""
+        if app_id and self._should_exclude_app(app_id):
+            return None
 
-        except Exception as e:
-            logger.error(f"格式化单个活动失败: {e}")
-            return ("开始", f"捣鼓 {activity_name}")
+        formatter = self._activity_formatters.get(activity_type, self._format_other)
+        return formatter(activity_name, details, state, large_text, app_id)
+
+    def _format_playing(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化游戏活动（type 0）"""
+        game_info_parts = [f"玩 {activity_name}"]
+
+        if self._should_include_field(0, "large_text", app_id):
+            if large_text:
+                game_info_parts.append(large_text.strip())
+
+        if self._should_include_field(0, "state", app_id):
+            if state:
+                state_text = state.strip()
+                game_info_parts.append(state_text)
+
+        if self._should_include_field(0, "details", app_id):
+            if details:
+                game_info_parts.append(details)
+
+        game_info = " | ".join(game_info_parts)
+        return ("开始", game_info)
+
+    def _format_streaming(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化直播活动（type 1）"""
+        stream_info = f"直播 {activity_name}"
+        if details and self._should_include_field(1, "details", app_id):
+            stream_info += f" ({details})"
+        return ("开始", stream_info)
+
+    def _format_listening(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化听音乐活动（type 2，如 Spotify）"""
+        include_details = bool(details) and self._should_include_field(
+            2, "details", app_id
+        )
+        include_state = bool(state) and self._should_include_field(2, "state", app_id)
+        if include_details and include_state:
+            return ("开始", f"听 {details} - {state}")
+        elif include_details:
+            return ("开始", f"听 {details}")
+        elif include_state:
+            return ("开始", f"听 {state}")
+        return ("开始", f"听 {activity_name}")
+
+    def _format_watching(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化观看活动（type 3）"""
+        watching_info = f"看 {activity_name}"
+        if details and self._should_include_field(3, "details", app_id):
+            watching_info += f" ({details})"
+        return ("开始", watching_info)
+
+    def _format_custom(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化自定义状态（type 4）"""
+        if state and self._should_include_field(4, "state", app_id):
+            return state
+        return "自定义状态"
+
+    def _format_competing(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化竞争活动（type 5）"""
+        competing_info = f"竞争 {activity_name}"
+        if details and self._should_include_field(5, "details", app_id):
+            competing_info += f" ({details})"
+        return ("开始", competing_info)
+
+    def _format_other(
+        self,
+        activity_name: str,
+        details: str,
+        state: str,
+        large_text: str,
+        app_id: str,
+    ) -> ActivityBrief:
+        """格式化未知类型的活动"""
+        return ("开始", f"捣鼓 {activity_name}")